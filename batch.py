@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from fastx import open_file
+from function_cache import load_function
+from gff2tbl import gff2tbl
+from seq_add_function import seq_add_function
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "invicoun@foxmail.com"
+__all__ = []
+
+
+def read_manifest(file):
+    """Manifest columns: name, gff, function, protein, origin; '-' for missing"""
+
+    fh = open_file(file)
+    r = []
+
+    for line in fh:
+        line = line.decode("utf-8").strip()
+        if not line or line.startswith("#"):
+            continue
+        line = line.split("\t")
+        line += ["-"] * (5-len(line))
+        name, gff, function, protein, origin = [i if i != "-" else "" for i in line[:5]]
+        r.append({"name": name, "gff": gff, "function": function,
+            "protein": protein, "origin": origin or "Unknown"})
+    fh.close()
+
+    return r
+
+
+def get_jobs(manifest, outdir, sort=False):
+
+    r = []
+
+    for genome in manifest:
+        if genome["gff"] and genome["function"]:
+            r.append(("gff2tbl", genome["name"], [genome["gff"], genome["function"], True, sort],
+                os.path.join(outdir, "%s.tbl" % genome["name"])))
+        if genome["protein"] and genome["function"]:
+            r.append(("seq_add_function", genome["name"], [genome["protein"], genome["function"], genome["origin"], True],
+                os.path.join(outdir, "%s.pep" % genome["name"])))
+        if not genome["function"]:
+            LOG.info("Genome %s has no function table, skip it" % genome["name"])
+
+    return r
+
+
+def get_size(job):
+
+    return sum(os.path.getsize(i) for i in job[2][:2] if os.path.isfile(i))
+
+
+def compile_function(file):
+
+    load_function(file)
+
+    return file
+
+
+def run_job(task, name, args, output):
+    """Run one job in a worker, write its stdout to output only when it succeeds"""
+
+    start = time.time()
+    error = ""
+    stdout = sys.stdout
+    temp = "%s.tmp" % output
+
+    try:
+        with open(temp, "w") as fh:
+            sys.stdout = fh
+            if task == "gff2tbl":
+                gff2tbl(*args)
+            else:
+                seq_add_function(*args)
+    except Exception as e:
+        error = "%s: %s" % (type(e).__name__, e)
+    finally:
+        sys.stdout = stdout
+
+    if error:
+        if os.path.exists(temp):
+            os.remove(temp)
+    else:
+        os.replace(temp, output)
+
+    return task, name, output, time.time()-start, error
+
+
+def run_pool(jobs, threads=4):
+    """Run the jobs in a process pool, yield (task, name, output, seconds, error)
+
+    At most one job per worker is in flight. When a worker dies, the jobs
+    in flight are reported as failed and the rest go to a new pool.
+    """
+
+    jobs = deque(jobs)
+
+    while jobs:
+        with ProcessPoolExecutor(threads) as pool:
+            running = {}
+            broken = False
+            while running or (jobs and not broken):
+                while jobs and not broken and len(running) < threads:
+                    job = jobs.popleft()
+                    running[pool.submit(run_job, *job)] = (job, time.time())
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    (task, name, args, output), start = running.pop(future)
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                        yield task, name, output, time.time()-start, "%s: %s" % (type(e).__name__, e)
+        if jobs:
+            LOG.info("A worker died, run the %s remaining jobs in a new pool" % len(jobs))
+
+
+def run_batch(manifest, outdir, threads=4, sort=False):
+
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    jobs = get_jobs(read_manifest(manifest), outdir, sort)
+    jobs.sort(key=get_size, reverse=True) #Largest inputs first, idle workers take the next job
+    tables = sorted(set(i[2][1] for i in jobs if os.path.isfile(i[2][1])))
+    failed = 0
+
+    print("#Name\tTask\tStatus\tSeconds\tOutput\tError")
+    with ProcessPoolExecutor(threads) as pool:
+        #Compile every function table once, the jobs then share the cache
+        for future in as_completed([pool.submit(compile_function, i) for i in tables]):
+            try:
+                future.result()
+            except Exception as e:
+                LOG.info("Cannot compile the function table: %s" % e)
+
+    for task, name, output, seconds, error in run_pool(jobs, threads):
+        if error:
+            failed += 1
+        print("%s\t%s\t%s\t%.3f\t%s\t%s" % (name, task, "failed" if error else "done", seconds, output, error))
+        sys.stdout.flush()
+
+    LOG.info("%s jobs done, %s failed" % (len(jobs)-failed, failed))
+
+    return failed
+
+
+def add_help_args(parser):
+
+    parser.add_argument("manifest", metavar="FILE", type=str,
+        help="Input manifest (name, gff, function, protein, origin; tab separated, '-' for missing).")
+    parser.add_argument("-o", "--outdir", metavar="DIR", type=str, default=".",
+        help="Output directory, default=current directory.")
+    parser.add_argument("-t", "--threads", metavar="INT", type=int, default=4,
+        help="Number of worker processes, default=4.")
+    parser.add_argument("--sorted", action="store_true",
+        help="The gff files are sorted, write the tables while reading.")
+
+    return parser
+
+
+def main():
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s"
+    )
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+    description='''
+name:
+    batch.py: Run gff2tbl and seq_add_function for many genomes in a process pool
+For exmple:
+    batch.py genomes.tsv --outdir submit --threads 16 >batch.report.tsv
+
+version: %s
+contact:  %s <%s>\
+    ''' % (__version__, " ".join(__author__), __email__))
+
+    args = add_help_args(parser).parse_args()
+
+    if run_batch(args.manifest, args.outdir, args.threads, args.sorted):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+
+    main()
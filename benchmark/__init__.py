@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Synthetic data and timed scenarios for the gffvert tools.
+
+    python -m benchmark.run_benchmark --outdir benchmark_data --json result.json
+"""
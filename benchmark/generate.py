@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import gzip
+import random
+import logging
+import argparse
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "invicoun@foxmail.com"
+__all__ = ["generate", "get_files"]
+
+BASES = "ACGT"
+REPEATS = [("L1", "LINE/L1"), ("Gypsy", "LTR/Gypsy"), ("Copia", "LTR/Copia"), ("hAT", "DNA/hAT"),
+    ("Helitron", "RC/Helitron"), ("MITE", "DNA/MITE"), ("(AT)n", "Simple_repeat"), ("GC_rich", "Low_complexity")]
+PRODUCTS = ["DNA polymerase", "ATP synthase subunit alpha", "ribosomal protein L2", "transporter", "kinase"]
+
+
+def random_seq(rng, length):
+
+    return "".join(rng.choices(BASES, k=length))
+
+
+def write_seq(fh, seqid, seq, width=60):
+
+    fh.write(">%s\n" % seqid)
+    for i in range(0, len(seq), width):
+        fh.write("%s\n" % seq[i:i+width])
+
+
+def make_contig(rng, length, gap_rate=0.00005):
+    """A random sequence with runs of N and soft-masked (lowercase) stretches"""
+
+    seq = []
+    size = 0
+
+    while size < length:
+        block = min(rng.randint(1000, 200000), length-size)
+        part = random_seq(rng, block)
+        if rng.random() < 0.2:
+            part = part.lower()
+        seq.append(part)
+        size += block
+        if size < length and rng.random() < gap_rate*block:
+            gap = min(rng.choice([100, 500, rng.randint(1, 5000)]), length-size)
+            seq.append("N"*gap)
+            size += gap
+
+    return "".join(seq)
+
+
+def write_genome(prefix, rng, contigs, length):
+
+    r = []
+    with open("%s.genome.fasta" % prefix, "w") as fh:
+        for i in range(contigs):
+            seqid = "ctg%04d" % (i+1)
+            seqlen = rng.randint(length//2, length*3//2)
+            write_seq(fh, seqid, make_contig(rng, seqlen))
+            r.append((seqid, seqlen))
+    with open("%s.genome.fasta" % prefix, "rb") as fh, gzip.open("%s.genome.fasta.gz" % prefix, "wb", 1) as out:
+        while True:
+            data = fh.read(1 << 24)
+            if not data:
+                break
+            out.write(data)
+
+    return r
+
+
+def write_gff(prefix, rng, seqs):
+    """gene/mRNA/exon/CDS models, one in four genes has a second mRNA"""
+
+    mrnas = []
+    fh = open("%s.genome.gff3" % prefix, "w")
+    fh.write("##gff-version 3\n")
+    n = 0
+
+    for seqid, seqlen in seqs:
+        start = rng.randint(1, 2000)
+        while start + 7000 < seqlen:
+            n += 1
+            geneid = "gene%06d" % n
+            strand = rng.choice("+-")
+            exons = []
+            pos = start
+            for i in range(rng.randint(1, 6)):
+                size = rng.randint(60, 600)
+                exons.append((pos, pos+size-1))
+                pos += size + rng.randint(50, 500)
+            end = exons[-1][1]
+            fh.write("%s\tbenchmark\tgene\t%s\t%s\t.\t%s\t.\tID=%s;Name=%s\n" % (seqid, start, end, strand, geneid, geneid))
+            models = [exons]
+            if rng.random() < 0.25 and len(exons) > 1:
+                models.append(exons[:-1] if strand == "+" else exons[1:])
+            for i, model in enumerate(models):
+                mrnaid = "%s.t%s" % (geneid, i+1)
+                mrnas.append(mrnaid)
+                fh.write("%s\tbenchmark\tmRNA\t%s\t%s\t.\t%s\t.\tID=%s;Parent=%s\n" % (seqid,
+                    model[0][0], model[-1][1], strand, mrnaid, geneid))
+                phase = 0
+                for j, (es, ee) in enumerate(model):
+                    fh.write("%s\tbenchmark\texon\t%s\t%s\t.\t%s\t.\tID=%s.exon%s;Parent=%s\n" % (seqid,
+                        es, ee, strand, mrnaid, j+1, mrnaid))
+                for j, (es, ee) in enumerate(model if strand == "+" else model[::-1]):
+                    fh.write("%s\tbenchmark\tCDS\t%s\t%s\t.\t%s\t%s\tID=%s.cds;Parent=%s\n" % (seqid,
+                        es, ee, strand, phase, mrnaid, mrnaid))
+                    phase = (3 - (ee-es+1-phase) % 3) % 3
+            start = end + rng.randint(200, 20000)
+    fh.close()
+
+    return mrnas
+
+
+def write_bed(prefix, rng, seqs):
+    """Hi-C bed: contig segments placed on chromosomes in a random order and strand"""
+
+    segments = []
+    for seqid, seqlen in seqs:
+        cuts = sorted(rng.sample(range(1000, seqlen-1000), rng.randint(0, 2))) if seqlen > 4000 else []
+        start = 1
+        for cut in cuts + [seqlen]:
+            segments.append((seqid, start, cut))
+            start = cut + 1
+    rng.shuffle(segments)
+
+    chroms = max(1, len(segments)//10)
+    fh = open("%s.hic.bed" % prefix, "w")
+    for i in range(chroms):
+        chrid = "chr%s" % (i+1)
+        pos = 1
+        for seqid, start, end in segments[i::chroms]:
+            strand = rng.choice("+-")
+            cend = pos + end - start
+            if strand == "+":
+                fh.write("%s\t%s\t%s\t%s\t%s\t+\t%s\t%s\n" % (seqid, start, end, chrid, chrid, pos, cend))
+            else:
+                fh.write("%s\t%s\t%s\t%s\t%s\t-\t%s\t%s\n" % (seqid, start, end, chrid, chrid, cend, pos))
+            pos = cend + 101
+    fh.close()
+
+
+def write_masker(prefix, rng, seqs, density=0.002):
+    """RepeatMasker .out with overlapping hits of several repeat classes"""
+
+    fh = open("%s.repeatmasker.out" % prefix, "w")
+    fh.write("   SW   perc perc perc  query      position in query    matching       repeat              position in repeat\n")
+    fh.write("score   div. del. ins.  sequence   begin  end  (left)   repeat         class/family      begin  end (left)   ID\n\n")
+    n = 0
+    for seqid, seqlen in seqs:
+        for i in range(int(seqlen*density)):
+            n += 1
+            start = rng.randint(1, seqlen-50)
+            end = min(seqlen, start + rng.randint(20, 6000))
+            name, family = rng.choice(REPEATS)
+            fh.write("%6s %5.1f %4.1f %4.1f  %s %9s %9s (%s) %s  %s %s %6s %6s (%s) %6s\n" % (rng.randint(200, 9000),
+                rng.random()*30, rng.random()*5, rng.random()*5, seqid, start, end, seqlen-end,
+                rng.choice(["+", "C"]), name, family, 1, end-start+1, 0, n))
+    fh.close()
+
+
+def write_function(prefix, rng, mrnas):
+    """merge.function.xls and the matching protein fasta"""
+
+    fh = open("%s.merge.function.xls" % prefix, "w")
+    fh.write("#Gene ID\tLength\tGene name\t%s\n" % "\t".join("Column%s" % i for i in range(3, 18)))
+    for mrnaid in mrnas:
+        line = [mrnaid, str(rng.randint(100, 3000))]
+        line.append(rng.choice(["-", "dnaA", "atpA,atpAB", "rplB", "longgenename,abc"]))
+        line += [rng.choice(PRODUCTS) if rng.random() < 0.3 else "-" for i in range(15)]
+        fh.write("%s\n" % "\t".join(line))
+    fh.close()
+
+    fh = open("%s.protein.fasta" % prefix, "w")
+    for mrnaid in mrnas:
+        write_seq(fh, mrnaid, "M%s" % "".join(rng.choices("ACDEFGHIKLMNPQRSTVWY", k=rng.randint(50, 500))))
+    fh.close()
+
+
+def get_files(outdir):
+    """The input file paths of the data set in outdir"""
+
+    prefix = os.path.join(outdir, "synthetic")
+
+    return {
+        "genome": "%s.genome.fasta" % prefix,
+        "genome_gz": "%s.genome.fasta.gz" % prefix,
+        "gff": "%s.genome.gff3" % prefix,
+        "bed": "%s.hic.bed" % prefix,
+        "repeat": "%s.repeatmasker.out" % prefix,
+        "function": "%s.merge.function.xls" % prefix,
+        "protein": "%s.protein.fasta" % prefix,
+    }
+
+
+def generate(outdir, contigs=20, length=1000000, seed=1):
+    """Write a deterministic synthetic data set, return the input file paths"""
+
+    rng = random.Random(seed)
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    prefix = os.path.join(outdir, "synthetic")
+
+    LOG.info("Generate %s contigs of about %s bp in %s" % (contigs, length, outdir))
+    seqs = write_genome(prefix, rng, contigs, length)
+    mrnas = write_gff(prefix, rng, seqs)
+    write_bed(prefix, rng, seqs)
+    write_masker(prefix, rng, seqs)
+    write_function(prefix, rng, mrnas)
+
+    return get_files(outdir)
+
+
+def add_help_args(parser):
+
+    parser.add_argument("-o", "--outdir", metavar="DIR", type=str, default="benchmark_data",
+        help="Output directory, default=benchmark_data.")
+    parser.add_argument("-n", "--contigs", metavar="INT", type=int, default=20,
+        help="Number of contigs, default=20.")
+    parser.add_argument("-l", "--length", metavar="INT", type=int, default=1000000,
+        help="Mean contig length, default=1000000.")
+    parser.add_argument("-s", "--seed", metavar="INT", type=int, default=1,
+        help="Random seed, default=1.")
+
+    return parser
+
+
+def main():
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s"
+    )
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+    description='''
+name:
+    generate.py: Generate synthetic genome, gff3, Hi-C bed, RepeatMasker and function files
+For exmple:
+    python -m benchmark.generate --outdir benchmark_data --contigs 20 --length 1000000
+
+version: %s
+contact:  %s <%s>\
+    ''' % (__version__, " ".join(__author__), __email__))
+
+    args = add_help_args(parser).parse_args()
+
+    generate(args.outdir, args.contigs, args.length, args.seed)
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gzip
+import logging
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "v1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "1131978210@qq.com"
+__all__ = ["read_fasta", "read_fastq"]
+
+
+def read_fasta(file):
+    '''Read fasta file'''
+
+    if file.endswith(".gz"):
+        fp = gzip.open(file)
+    elif file.endswith(".fasta") or file.endswith(".fa"):
+        fp = open(file)
+    else:
+        raise Exception("%r file format error" % file)
+
+    seq = ''
+    for line in fp:
+        if type(line) == type(b''):
+            line = line.decode('utf-8')
+
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(">"):
+            line = line.strip(">").split()[0]
+            if seq:
+                yield seq.split('\n')
+            seq = "%s\n" % line
+        else:
+            seq += line
+    if seq:
+        yield seq.split('\n')
+    fp.close()
+
+
+def read_fastq(file):
+    '''Read fastq file'''
+    if file.endswith(".gz"):
+        fp = gzip.open(file)
+    elif file.endswith(".fastq") or file.endswith(".fq"):
+        fp = open(file)
+    else:
+        raise Exception("%r file format error" % file)
+
+    seq = []
+    for line in fp:
+        if type(line) == type(b''):
+            line = line.decode('utf-8')
+        line = line.strip()
+
+        if not line:
+            continue
+        if not seq:
+            seq.append(line.strip("@"))
+            continue
+        seq.append(line)
+
+        if len(seq)==4:
+            yield seq
+            seq = []
+    fp.close()
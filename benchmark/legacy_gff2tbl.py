@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import logging
+import argparse
+import collections
+
+from fastx import open_file
+from function_cache import load_function
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang,Shuying Deng",)
+__email__ = "invicoun@foxmail.com"
+__all__ = ["gff2tbl"]
+
+
+def read_tsv(file, sep=None):
+
+    fh = open_file(file)
+
+    for line in fh:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+
+        if not line or line.startswith("#"):
+            continue
+
+        yield line.split(sep)
+
+    fh.close()
+
+
+def split_attr(attributes, sep="="):
+
+    r = collections.OrderedDict()
+    contents = attributes.split(";")
+
+    for content in contents:
+        if not content:
+            continue
+        if sep not in content:
+            LOG.info("%r is not a good formated attribute: no tag!" % content)
+            continue
+        tag, value = content.strip().split(sep, 1)
+        r[tag] = value.strip('"')
+
+    return r
+
+
+def read_gff2gene(file):
+
+    gene = []
+    mrna_dict = {}
+    cds_dict = {}
+    geneid = ""
+    parent = ""
+
+    for line in read_tsv(file, "\t"):
+        if line[2] == "gene":
+            gene.append(line)
+            attr = split_attr(line[-1])
+            geneid = attr["ID"]
+            continue
+        if line[2] == "mRNA":
+            attr = split_attr(line[-1])
+            if geneid != attr["Parent"]:
+                LOG.info("Gene %s has no mRNA information" % geneid)
+                break
+            parent = attr["ID"]
+            if geneid not in mrna_dict:
+                mrna_dict[geneid] = line
+
+        if line[2] == "CDS":
+            attr = split_attr(line[-1])
+            if parent != attr["Parent"]:
+                LOG.info("Gene %s has no CDS information" % geneid)
+                break
+            if geneid not in cds_dict:
+                cds_dict[geneid] = []
+            cds_dict[geneid].append(line)
+
+    return gene, mrna_dict, cds_dict
+
+
+def gff2tbl(gff, function, cache=True):
+
+    r = load_function(function, cache)
+    gene, mrna_dict, cds_dict = read_gff2gene(gff)
+    seqid = ""
+
+    for line in sorted(gene, key = lambda x:(x[0], int(x[3]), int(x[4]))):
+        attr = split_attr(line[-1])
+        geneid = attr["ID"]
+        if geneid not in cds_dict:
+            LOG.info("Gene %s has no CDS information" % geneid)
+            break
+        if geneid not in mrna_dict:
+           LOG.info("Gene %s has no mRNA information" % geneid)
+           break
+        if line[0] != seqid:
+            print(">Feature %s" % line[0])
+            seqid = line[0]
+        mrna = mrna_dict[geneid]
+        mrnaid = split_attr(mrna[-1])["ID"]
+
+        gene_nane = ""
+        func = "hypothetical protein"
+        if mrnaid in r:
+            gene_nane = r[mrnaid][0]
+            func = r[mrnaid][1]
+        if gene_nane:
+            gene_nane = "\n\t\tgene\t%s" % gene_nane
+
+        print("{start}\t{end}\tgene{gene}\n\t\tlocus_tag\t{locus_tag}".format(start=line[3],
+            end=line[4], gene=gene_nane, locus_tag=geneid))
+        temp = []
+        for line in cds_dict[geneid]:
+            if line[6] == "-":
+                temp.append((line[4], line[3]))
+            else:
+                temp.append((line[3], line[4]))
+        print("%s\t%s\tCDS" % (temp[0][0], temp[0][1]))
+        for i in temp[1::]:
+            print("%s\t%s" % (i[0], i[1]))
+        print("\t\tproduct\t%s\n\t\tprotein_id\t%s" % (func, mrnaid))
+
+    return 0
+
+
+def add_help_args(parser):
+
+    parser.add_argument("input", metavar="FILE", type=str,
+        help="Input gff file")
+    parser.add_argument("-f", "--function", metavar="FILE", type=str, required=True,
+        help="Input gene function annotation results, merge.function.xls.")
+    parser.add_argument("--no_cache", action="store_true",
+        help="Do not compile the function table into the cache (~/.cache/gffvert).")
+
+    return parser
+
+
+def main():
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s"
+    )
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+    description='''
+name:
+    legacy_gff2tbl.py: The gff2tbl before the streaming writer, the reference of the benchmark
+For exmple:
+    python -m benchmark.legacy_gff2tbl prefix.gff3 --function merge.function.xls >prefix.tbl
+
+version: %s
+contact:  %s <%s>\
+    ''' % (__version__, " ".join(__author__), __email__))
+
+    args = add_help_args(parser).parse_args()
+
+    gff2tbl(args.input, args.function, not args.no_cache)
+
+
+if __name__ == "__main__":
+
+    main()
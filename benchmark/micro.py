@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tracemalloc
+
+from itertools import cycle, islice
+
+from fastx import open_file, read_fasta, read_fastq
+from gffattr import split_attr, get_attr
+from feature import read_feature
+from stat_genome_gap import stat_gap
+from benchmark.legacy_stat_genome_gap import stat_gap as legacy_stat_gap
+from benchmark import legacy_fastx
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "invicoun@foxmail.com"
+__all__ = ["bench_attr", "bench_feature", "bench_gap", "bench_fastx"]
+
+PARSERS = {"split_attr": split_attr, "get_attr": get_attr}
+
+
+def make_attributes(number=100000, seed=1):
+    """NCBI-like CDS attributes with 9 tags, one string in a hundred has a tag without value"""
+
+    rng = random.Random(seed)
+    r = []
+
+    for i in range(number):
+        attr = ["ID=cds-XP_%06d.1" % i, "Parent=rna-XM_%06d.1" % i, "Dbxref=GeneID:%s,Genbank:XP_%06d.1" % (rng.randint(1, 10**6), i),
+            "Name=XP_%06d.1" % i, "gbkey=CDS", "gene=LOC%s" % rng.randint(1, 10**6),
+            "product=%s" % rng.choice(["uncharacterized protein", "ATP synthase subunit alpha", "kinase isoform X1"]),
+            "protein_id=XP_%06d.1" % i, "locus_tag=ABC_%05d" % i]
+        rng.shuffle(attr)
+        if rng.random() < 0.01:
+            attr.insert(rng.randint(0, len(attr)), "partial")
+        r.append(";".join(attr))
+
+    return r
+
+
+def bench_attr(parser="get_attr", count=10000000, seed=1):
+    """Parse count attribute strings (a fixed set repeated as needed), return the parse rate"""
+
+    func = PARSERS[parser]
+    attributes = make_attributes(seed=seed)
+
+    start = time.perf_counter()
+    for i in islice(cycle(attributes), count):
+        func(i)
+    wall = time.perf_counter() - start
+
+    return {"strings": count, "parse_wall": round(wall, 4), "rate": round(count/wall, 1)}
+
+
+def read_list(file):
+    """The features as before Feature: nine strings and the attribute dict"""
+
+    fh = open_file(file)
+
+    for line in fh:
+        line = line.decode("utf-8").strip()
+        if not line or line.startswith("#"):
+            continue
+        line = line.split("\t")
+        if len(line) < 9:
+            continue
+        yield [line, split_attr(line[8])]
+
+    fh.close()
+
+
+MODELS = {"list": read_list, "feature": read_feature}
+
+
+def bench_feature(file, model="feature"):
+    """Keep every feature of the gff in memory, return the traced bytes per feature"""
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    features = list(MODELS[model](file))
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    return {"features": len(features), "bytes_per_feature": round(size/max(len(features), 1), 1)}
+
+
+def make_chromosome(length=20000000, seed=1, spacing=100000):
+    """An upper case chromosome with a run of 1-5000 N about every spacing bases"""
+
+    rng = random.Random(seed)
+    block = bytes(rng.choices(b"ACGT", k=1 << 20))
+    seq = bytearray(block) * (length // len(block) + 1)
+    del seq[length:]
+
+    for start in range(rng.randint(1, spacing), length-5000, spacing):
+        size = rng.choice([100, 500, rng.randint(1, 5000)])
+        seq[start:start+size] = b"N" * size
+
+    return seq
+
+
+def bench_gap(scanner="stat_gap", length=20000000, seed=1):
+    """Scan a synthetic chromosome for gaps, stat_gap on bytes or the legacy scan on str"""
+
+    seq = make_chromosome(length, seed)
+    if scanner == "legacy":
+        seq = seq.decode("ascii")
+        func = legacy_stat_gap
+    else:
+        func = stat_gap
+
+    start = time.perf_counter()
+    gaps = func(seq)
+    wall = time.perf_counter() - start
+
+    return {"length": length, "gaps": len(gaps), "scan_wall": round(wall, 4), "mb_per_sec": round(length/wall/1e6, 1)}
+
+
+def get_size(file):
+    """Uncompressed size of the file"""
+
+    fh = open_file(file)
+    size = 0
+
+    while True:
+        data = fh.read(1 << 24)
+        if not data:
+            break
+        size += len(data)
+    fh.close()
+
+    return size
+
+
+def bench_fastx(file, reader="fastx"):
+    """Read every record of a fasta/fastq file, return the read speed on the uncompressed size"""
+
+    fastq = file.endswith((".fastq", ".fq", ".fastq.gz", ".fq.gz"))
+    if reader == "legacy":
+        records = legacy_fastx.read_fastq(file) if fastq else legacy_fastx.read_fasta(file)
+    else:
+        records = read_fastq(file) if fastq else read_fasta(file)
+    size = get_size(file) #Also brings the file into the page cache for both readers
+    number = 0
+    bases = 0
+
+    start = time.perf_counter()
+    for record in records:
+        number += 1
+        bases += len(record[1])
+    wall = time.perf_counter() - start
+
+    return {"bytes": size, "records": number, "bases": bases, "read_wall": round(wall, 4),
+        "mb_per_sec": round(size/wall/1e6, 1)}
+
+
+def add_help_args(parser):
+
+    parser.add_argument("bench", choices=["attr", "feature", "gap", "fastx"],
+        help="Micro-benchmark to run: attr, the attribute parse rate; feature, the bytes per gff feature; "
+        "gap, the gap scan speed; fastx, the fasta/fastq read speed.")
+    parser.add_argument("-i", "--input", metavar="FILE", type=str, default=None,
+        help="Input gff file of feature, fasta/fastq file (.gz) of fastx.")
+    parser.add_argument("-r", "--reader", choices=["fastx", "legacy"], default="fastx",
+        help="Reader of fastx, fastx or the legacy line by line reader, default=fastx.")
+    parser.add_argument("-m", "--model", choices=sorted(MODELS), default="feature",
+        help="Feature model of feature, list (nine strings and the attribute dict) or feature, default=feature.")
+    parser.add_argument("-p", "--parser", choices=sorted(PARSERS), default="get_attr",
+        help="Attribute parser of attr, default=get_attr.")
+    parser.add_argument("-n", "--count", metavar="INT", type=int, default=10000000,
+        help="Number of attribute strings parsed by attr, default=10000000.")
+    parser.add_argument("-g", "--scanner", choices=["legacy", "stat_gap"], default="stat_gap",
+        help="Gap scanner of gap, default=stat_gap.")
+    parser.add_argument("-l", "--length", metavar="INT", type=int, default=20000000,
+        help="Chromosome length of gap, default=20000000 (1000000000 for a 1 Gb chromosome).")
+    parser.add_argument("-s", "--seed", metavar="INT", type=int, default=1,
+        help="Random seed of the attribute strings and the chromosome, default=1.")
+    parser.add_argument("-j", "--json", metavar="FILE", type=str, default="-",
+        help="Write the metrics as json to FILE, default to stdout.")
+
+    return parser
+
+
+def main():
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s"
+    )
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+    description='''
+name:
+    micro.py: In-process micro-benchmarks of the shared parsers
+For exmple:
+    python -m benchmark.micro attr --parser split_attr --count 10000000
+    python -m benchmark.micro feature --input benchmark_data/synthetic.genome.gff3 --model list
+    python -m benchmark.micro gap --scanner legacy --length 1000000000
+    python -m benchmark.micro fastx --input benchmark_data/synthetic.genome.fasta.gz --reader legacy
+
+version: %s
+contact:  %s <%s>\
+    ''' % (__version__, " ".join(__author__), __email__))
+
+    args = add_help_args(parser).parse_args()
+
+    if args.bench == "attr":
+        r = bench_attr(args.parser, args.count, args.seed)
+        LOG.info("%s: %s strings/s" % (args.parser, r["rate"]))
+    elif args.bench == "gap":
+        r = bench_gap(args.scanner, args.length, args.seed)
+        LOG.info("%s: %s MB/s, %s gaps" % (args.scanner, r["mb_per_sec"], r["gaps"]))
+    elif not args.input:
+        parser.error("%s needs an input file (--input)" % args.bench)
+    elif args.bench == "fastx":
+        r = bench_fastx(args.input, args.reader)
+        LOG.info("%s: %s MB/s" % (args.reader, r["mb_per_sec"]))
+    else:
+        r = bench_feature(args.input, args.model)
+        LOG.info("%s: %s bytes per feature" % (args.model, r["bytes_per_feature"]))
+    if args.json == "-":
+        json.dump(r, sys.stdout)
+        print()
+    else:
+        with open(args.json, "w") as fh:
+            json.dump(r, fh)
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from benchmark.generate import get_files
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "invicoun@foxmail.com"
+__all__ = ["run_benchmark"]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOWER = ("wall", "max_rss_kb", "bytes_per_feature") #Regression when the value grows
+HIGHER = ("rate", "mb_per_sec") #Regression when the value drops
+
+
+def get_scenarios(data, gffvert=None, attrs=10000000, gap_length=20000000):
+    """Name and command line of every scenario, {script} is a script of this repository, -m a module of it
+
+    {metrics} is replaced with a json file, the metrics written there are
+    added to the result of the scenario.
+    """
+
+    r = [
+        ("stat_genome", ["{stat_genome.py}", data["genome"]]),
+        ("stat_genome.gz", ["{stat_genome.py}", data["genome_gz"]]),
+        ("fastx.fasta", ["-m", "benchmark.micro", "fastx", "--input", data["genome"], "--json", "{metrics}"]),
+        ("fastx.fasta.legacy", ["-m", "benchmark.micro", "fastx", "--input", data["genome"], "--reader", "legacy", "--json", "{metrics}"]),
+        ("fastx.fasta.gz", ["-m", "benchmark.micro", "fastx", "--input", data["genome_gz"], "--json", "{metrics}"]),
+        ("fastx.fasta.gz.legacy", ["-m", "benchmark.micro", "fastx", "--input", data["genome_gz"], "--reader", "legacy", "--json", "{metrics}"]),
+        ("stat_genome_gap", ["{stat_genome_gap.py}", data["genome"]]),
+        ("stat_genome_gap.legacy", ["-m", "benchmark.legacy_stat_genome_gap", data["genome"]]),
+        ("gap.stat_gap", ["-m", "benchmark.micro", "gap", "--scanner", "stat_gap", "--length", str(gap_length), "--json", "{metrics}"]),
+        ("gap.legacy", ["-m", "benchmark.micro", "gap", "--scanner", "legacy", "--length", str(gap_length), "--json", "{metrics}"]),
+        ("gff2tbl", ["{gff2tbl.py}", data["gff"], "--function", data["function"], "--no_cache"]),
+        ("gff2tbl.sorted", ["{gff2tbl.py}", data["gff"], "--function", data["function"], "--no_cache", "--sorted"]),
+        ("gff2tbl.cache", ["{gff2tbl.py}", data["gff"], "--function", data["function"]]),
+        ("gff2tbl.legacy", ["-m", "benchmark.legacy_gff2tbl", data["gff"], "--function", data["function"], "--no_cache"]),
+        ("seq_add_function", ["{seq_add_function.py}", data["protein"], "--function", data["function"], "--no_cache"]),
+        ("attr.split_attr", ["-m", "benchmark.micro", "attr", "--parser", "split_attr", "--count", str(attrs), "--json", "{metrics}"]),
+        ("attr.get_attr", ["-m", "benchmark.micro", "attr", "--parser", "get_attr", "--count", str(attrs), "--json", "{metrics}"]),
+        ("feature.list", ["-m", "benchmark.micro", "feature", "--input", data["gff"], "--model", "list", "--json", "{metrics}"]),
+        ("feature.feature", ["-m", "benchmark.micro", "feature", "--input", data["gff"], "--model", "feature", "--json", "{metrics}"]),
+        ("startup.stat_genome", ["{stat_genome.py}", "--help"]),
+        ("startup.stat_genome_gap", ["{stat_genome_gap.py}", "--help"]),
+        ("startup.gff2tbl", ["{gff2tbl.py}", "--help"]),
+        ("startup.seq_add_function", ["{seq_add_function.py}", "--help"]),
+    ]
+    if gffvert:
+        r += [
+            ("gffvert.sort_gff", [gffvert, "sort_gff", data["gff"]]),
+            ("gffvert.change_coords", [gffvert, "change_coords", data["gff"], "--bed", data["bed"]]),
+        ]
+
+    return r
+
+
+def run_command(cmd):
+    """Run a command with stdout discarded, return wall time, cpu time, peak RSS and its metrics"""
+
+    metrics = None
+    if "{metrics}" in cmd:
+        fd, metrics = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        cmd = [metrics if i == "{metrics}" else i for i in cmd]
+
+    start = time.time()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, cwd=ROOT)
+    stderr = proc.stderr.read()
+    pid, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.time() - start
+
+    if proc.returncode != 0:
+        LOG.info("%s failed: %s" % (" ".join(cmd), stderr.decode("utf-8", "replace")[-1000:]))
+
+    r = {
+        "status": "ok" if proc.returncode == 0 else "failed",
+        "wall": round(wall, 4),
+        "cpu": round(usage.ru_utime + usage.ru_stime, 4),
+        "max_rss_kb": usage.ru_maxrss,
+        "returncode": proc.returncode,
+    }
+    if metrics:
+        if proc.returncode == 0:
+            with open(metrics) as fh:
+                r.update(json.load(fh))
+        os.remove(metrics)
+
+    return r
+
+
+def get_best(runs):
+    """Fastest successful run with the largest peak RSS, failed runs are not timed"""
+
+    ok = [i for i in runs if i["returncode"] == 0]
+    failed = [i["returncode"] for i in runs if i["returncode"] != 0]
+
+    if not ok:
+        return {"status": "failed", "returncode": failed[0], "failed_runs": len(failed)}
+    best = dict(min(ok, key=lambda x: x["wall"]))
+    best["max_rss_kb"] = max(i["max_rss_kb"] for i in ok)
+    if failed:
+        best["status"] = "failed"
+        best["returncode"] = failed[0]
+    best["failed_runs"] = len(failed)
+
+    return best
+
+
+def compare(result, baseline, tolerance=0.2):
+    """Return the scenarios that failed or became slower or larger than the baseline"""
+
+    r = []
+
+    for name, value in result["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if value.get("status") == "failed":
+            if base and base.get("status", "ok") == "ok":
+                r.append("%s failed with exit code %s, the baseline succeeded" % (name, value["returncode"]))
+            else:
+                r.append("%s failed with exit code %s" % (name, value["returncode"]))
+            continue
+        if not base or base.get("status", "ok") != "ok":
+            continue
+        for key in LOWER:
+            if base.get(key) and key in value and value[key] > base[key]*(1+tolerance):
+                r.append("%s %s: %s -> %s" % (name, key, base[key], value[key]))
+        for key in HIGHER:
+            if base.get(key) and key in value and value[key] < base[key]*(1-tolerance):
+                r.append("%s %s: %s -> %s" % (name, key, base[key], value[key]))
+
+    return r
+
+
+def run_benchmark(outdir, contigs=20, length=1000000, seed=1, repeat=3, gffvert=None, only=None, attrs=10000000,
+    gap_length=20000000):
+
+    outdir = os.path.abspath(outdir)
+    #Generate in a child process: a child inherits the peak RSS of its parent
+    subprocess.run([sys.executable, "-m", "benchmark.generate", "--outdir", outdir, "--contigs", str(contigs),
+        "--length", str(length), "--seed", str(seed)], check=True, cwd=ROOT)
+    data = get_files(outdir)
+    if gffvert is None:
+        gffvert = shutil.which("gffvert")
+    result = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "contigs": contigs,
+            "length": length,
+            "seed": seed,
+            "repeat": repeat,
+            "attrs": attrs,
+            "gap_length": gap_length,
+            "inputs": {i: os.path.getsize(data[i]) for i in data},
+        },
+        "results": {},
+    }
+
+    for name, cmd in get_scenarios(data, gffvert, attrs, gap_length):
+        if only and name not in only:
+            continue
+        if cmd[0].startswith("{"):
+            cmd = [sys.executable, os.path.join(ROOT, cmd[0][1:-1])] + cmd[1:]
+        elif cmd[0] == "-m":
+            cmd = [sys.executable] + cmd
+        runs = [run_command(cmd) for i in range(repeat)]
+        best = get_best(runs)
+        result["results"][name] = best
+        if "wall" not in best:
+            LOG.info("%s\tfailed with exit code %s" % (name, best["returncode"]))
+            continue
+        metrics = "".join("\t%s %s" % (i, best[i]) for i in HIGHER + LOWER[2:] if i in best)
+        LOG.info("%s\t%.3f s\t%.3f s cpu\t%s KB%s\t%s" % (name, best["wall"], best["cpu"], best["max_rss_kb"], metrics, best["status"]))
+
+    return result
+
+
+def add_help_args(parser):
+
+    parser.add_argument("-o", "--outdir", metavar="DIR", type=str, default="benchmark_data",
+        help="Directory of the synthetic data, default=benchmark_data.")
+    parser.add_argument("-n", "--contigs", metavar="INT", type=int, default=20,
+        help="Number of contigs, default=20.")
+    parser.add_argument("-l", "--length", metavar="INT", type=int, default=1000000,
+        help="Mean contig length, default=1000000.")
+    parser.add_argument("-s", "--seed", metavar="INT", type=int, default=1,
+        help="Random seed, default=1.")
+    parser.add_argument("-r", "--repeat", metavar="INT", type=int, default=3,
+        help="Run every scenario INT times and keep the fastest, default=3.")
+    parser.add_argument("-a", "--attrs", metavar="INT", type=int, default=10000000,
+        help="Number of attribute strings parsed by the attr scenarios, default=10000000.")
+    parser.add_argument("-g", "--gap_length", metavar="INT", type=int, default=20000000,
+        help="Chromosome length of the gap scenarios, 1000000000 for 1 Gb, default=20000000.")
+    parser.add_argument("--only", metavar="STR", nargs="+", default=None,
+        help="Only run the given scenarios.")
+    parser.add_argument("--gffvert", metavar="FILE", type=str, default=None,
+        help="gffvert executable for the gffvert scenarios, default is gffvert in PATH.")
+    parser.add_argument("-j", "--json", metavar="FILE", type=str, default=None,
+        help="Write the results to a json file.")
+    parser.add_argument("-b", "--baseline", metavar="FILE", type=str, default=None,
+        help="Compare with the results of a previous run, exit 1 on regression or failure.")
+    parser.add_argument("-t", "--tolerance", metavar="FLOAT", type=float, default=0.2,
+        help="Allowed slowdown or memory growth against the baseline, default=0.2.")
+
+    return parser
+
+
+def main():
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s"
+    )
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+    description='''
+name:
+    run_benchmark.py: Time the tools on synthetic data and catch regressions
+For exmple:
+    python -m benchmark.run_benchmark --json new.json --baseline old.json
+
+version: %s
+contact:  %s <%s>\
+    ''' % (__version__, " ".join(__author__), __email__))
+
+    args = add_help_args(parser).parse_args()
+
+    result = run_benchmark(args.outdir, args.contigs, args.length, args.seed,
+        args.repeat, args.gffvert, args.only, args.attrs, args.gap_length)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(result, fh, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+    regression = compare(result, baseline, args.tolerance) #Failed scenarios count even without a baseline
+    for i in regression:
+        LOG.info("Regression: %s" % i)
+    if regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+
+    main()
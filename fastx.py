@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import gzip
+import zlib
+import queue
+import struct
+import logging
+import threading
+
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "invicoun@foxmail.com"
+__all__ = ["open_file", "read_fasta", "read_fastq", "BgzfWriter", "bgzip_stdout", "bgzip_output"]
+
+CHUNK = 1 << 24 #Read 16 MB at a time
+SPACE = b" \t\r\n"
+THREADS = min(os.cpu_count() or 1, 8)
+BGZF_BLOCK = 0xff00 #Uncompressed bytes per BGZF block, as in htslib
+BGZF_HEADER = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+BGZF_EOF = BGZF_HEADER + b"\x1b\x00\x03\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+
+
+def is_bgzf(file):
+    """BGZF files are gzip members with a 'BC' extra subfield"""
+
+    with open(file, "rb") as fh:
+        header = fh.read(16)
+
+    return len(header) == 16 and header[:4] == b"\x1f\x8b\x08\x04" and header[12:14] == b"BC"
+
+
+def inflate(cdata, crc, size):
+    """Inflate one BGZF block and check it against the CRC32 and ISIZE of its trailer"""
+
+    data = zlib.decompress(cdata, -15)
+    if len(data) != size:
+        raise Exception("BGZF block length check failed: %s != %s" % (len(data), size))
+    if zlib.crc32(data) & 0xffffffff != crc:
+        raise Exception("BGZF block CRC check failed")
+
+    return data
+
+
+class BgzfReader(io.RawIOBase):
+    """Read BGZF blocks in order and inflate them in a thread pool"""
+
+    def __init__(self, file, threads=THREADS):
+
+        self.fh = open(file, "rb")
+        self.pool = ThreadPoolExecutor(threads)
+        self.pending = deque()
+        self.depth = threads * 4
+        self.data = memoryview(b"")
+        self.eof = False
+
+    def readable(self):
+
+        return True
+
+    def next_block(self):
+
+        header = self.fh.read(12)
+        if len(header) < 12:
+            return None
+        if header[:4] != b"\x1f\x8b\x08\x04":
+            raise Exception("%r is not a BGZF block" % self.fh.name)
+        xlen = struct.unpack("<H", header[10:12])[0]
+        extra = self.fh.read(xlen)
+        bsize = 0
+        pos = 0
+        while pos < xlen:
+            slen = struct.unpack("<H", extra[pos+2:pos+4])[0]
+            if extra[pos:pos+2] == b"BC":
+                bsize = struct.unpack("<H", extra[pos+4:pos+6])[0]
+            pos += 4 + slen
+        if not bsize:
+            raise Exception("%r is not a BGZF block" % self.fh.name)
+
+        data = self.fh.read(bsize-xlen-19+8)
+        if len(data) != bsize-xlen-19+8:
+            raise Exception("%r is truncated" % self.fh.name)
+        crc, size = struct.unpack("<II", data[-8:])
+
+        return data[:-8], crc, size
+
+    def fill(self):
+
+        while not self.eof and len(self.pending) < self.depth:
+            block = self.next_block()
+            if block is None:
+                self.eof = True
+                break
+            self.pending.append(self.pool.submit(inflate, *block))
+
+    def readinto(self, b):
+
+        while not self.data:
+            self.fill()
+            if not self.pending:
+                return 0
+            self.data = memoryview(self.pending.popleft().result())
+        size = min(len(b), len(self.data))
+        b[:size] = self.data[:size]
+        self.data = self.data[size:]
+
+        return size
+
+    def close(self):
+
+        if not self.closed:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.fh.close()
+        super(BgzfReader, self).close()
+
+
+class ThreadedReader(io.RawIOBase):
+    """Decompress in a background thread that feeds a bounded queue"""
+
+    def __init__(self, fh, chunk=CHUNK, maxsize=4):
+
+        self.fh = fh
+        self.queue = queue.Queue(maxsize)
+        self.data = memoryview(b"")
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.produce, args=(chunk,), daemon=True)
+        self.thread.start()
+
+    def readable(self):
+
+        return True
+
+    def produce(self, chunk):
+
+        try:
+            while not self.stop.is_set():
+                data = self.fh.read(chunk)
+                self.put(data)
+                if not data:
+                    break
+        except Exception as error:
+            self.put(error)
+
+    def put(self, data):
+
+        while not self.stop.is_set():
+            try:
+                self.queue.put(data, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readinto(self, b):
+
+        if not self.data:
+            if self.thread is None:
+                return 0
+            data = self.queue.get()
+            if isinstance(data, Exception):
+                raise data
+            if not data:
+                self.thread = None
+                return 0
+            self.data = memoryview(data)
+        size = min(len(b), len(self.data))
+        b[:size] = self.data[:size]
+        self.data = self.data[size:]
+
+        return size
+
+    def close(self):
+
+        if not self.closed:
+            self.stop.set()
+            self.fh.close()
+        super(ThreadedReader, self).close()
+
+
+def open_file(file, threads=THREADS):
+    """Open a plain, gzipped or BGZF file in binary mode
+
+    BGZF blocks are inflated in parallel, plain gzip is inflated in a
+    background thread.
+    """
+
+    if not file.endswith(".gz"):
+        return open(file, "rb")
+    if is_bgzf(file):
+        return io.BufferedReader(BgzfReader(file, threads), CHUNK)
+
+    return io.BufferedReader(ThreadedReader(gzip.open(file, "rb")), CHUNK)
+
+
+class BgzfWriter(io.RawIOBase):
+    """Write BGZF blocks so that the output can be indexed and seeked by htslib"""
+
+    def __init__(self, fh, level=6):
+
+        self.fh = fh
+        self.level = level
+        self.buffer = bytearray()
+
+    def writable(self):
+
+        return True
+
+    def write_block(self, data):
+
+        compress = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        cdata = compress.compress(data) + compress.flush()
+        self.fh.write(BGZF_HEADER)
+        self.fh.write(struct.pack("<H", len(cdata)+25))
+        self.fh.write(cdata)
+        self.fh.write(struct.pack("<II", zlib.crc32(data) & 0xffffffff, len(data)))
+
+    def write(self, data):
+
+        self.buffer.extend(data)
+        while len(self.buffer) >= BGZF_BLOCK:
+            self.write_block(bytes(self.buffer[:BGZF_BLOCK]))
+            del self.buffer[:BGZF_BLOCK]
+
+        return len(data)
+
+    def close(self):
+
+        if not self.closed:
+            if self.buffer:
+                self.write_block(bytes(self.buffer))
+                self.buffer = bytearray()
+            self.fh.write(BGZF_EOF)
+            self.fh.flush()
+        super(BgzfWriter, self).close()
+
+
+def bgzip_stdout(level=6):
+    """Replace sys.stdout so that everything printed is written as BGZF"""
+
+    sys.stdout.flush()
+    writer = BgzfWriter(sys.stdout.buffer, level)
+    sys.stdout = io.TextIOWrapper(io.BufferedWriter(writer, CHUNK), encoding="utf-8")
+
+    return sys.stdout
+
+
+@contextmanager
+def bgzip_output(bgzip=True, level=6):
+    """Write stdout as BGZF inside the block when bgzip is set
+
+    The BGZF stream is finished and sys.stdout restored even when the
+    block raises.
+    """
+
+    if not bgzip:
+        yield sys.stdout
+        return
+    stdout = sys.stdout
+    out = bgzip_stdout(level)
+    try:
+        yield out
+    finally:
+        out.close()
+        sys.stdout = stdout
+
+
+def read_block(file, chunk=CHUNK):
+    """Yield large blocks of the file that always end at a line break"""
+
+    fh = open_file(file)
+    pending = [] #Chunks without a line break yet, joined once
+
+    try:
+        while True:
+            block = fh.read(chunk)
+            if not block:
+                break
+            cut = block.rfind(b"\n") + 1
+            if not cut:
+                pending.append(block)
+                continue
+            if pending:
+                pending.append(block)
+                block = b"".join(pending)
+                cut += len(block) - len(pending[-1])
+                pending = []
+            if cut < len(block):
+                pending.append(block[cut:])
+                block = block[:cut]
+            yield block
+
+        if pending:
+            pending.append(b"\n")
+            yield b"".join(pending)
+    finally: #Also when the reader is dropped early, a background inflate thread is stopped
+        fh.close()
+
+
+def get_seqid(header):
+
+    header = header.split(None, 1)
+    if not header:
+        return ""
+
+    return header[0].decode("utf-8")
+
+
+def read_fasta(file, chunk=CHUNK):
+    """Read fasta file, yield (id, sequence) with the sequence kept as bytes"""
+
+    seqid = None
+    parts = []
+
+    for block in read_block(file, chunk):
+        view = memoryview(block)
+        pos = 0
+        end = len(block)
+
+        while pos < end:
+            if block[pos] == 62: #'>'
+                line = block.find(b"\n", pos)
+                if seqid is not None:
+                    seq = b"".join(parts)
+                    parts = [] #Drop the pieces before yielding, the record is not held twice
+                    seq = seq.translate(None, SPACE)
+                    yield seqid, seq
+                    del seq
+                seqid = get_seqid(block[pos+1:line])
+                parts = []
+                pos = line + 1
+                continue
+            line = block.find(b"\n>", pos)
+            if line < 0:
+                line = end
+            else:
+                line += 1
+            if seqid is not None:
+                parts.append(view[pos:line])
+            pos = line
+
+    if seqid is not None:
+        seq = b"".join(parts)
+        parts = []
+        seq = seq.translate(None, SPACE)
+        yield seqid, seq
+
+
+def read_fastq(file, chunk=CHUNK):
+    """Read fastq file, yield (id, sequence, quality) with sequence and quality as bytes"""
+
+    seq = []
+
+    for block in read_block(file, chunk):
+        for line in block.split(b"\n"):
+            line = line.strip()
+            if not line:
+                continue
+            seq.append(line)
+            if len(seq) == 4:
+                yield get_seqid(seq[0][1:]), seq[1], seq[3]
+                seq = []
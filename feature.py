@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import logging
+
+from fastx import open_file
+from gffattr import split_attr, get_attr
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "invicoun@foxmail.com"
+__all__ = ["Feature", "read_feature"]
+
+
+class Feature(object):
+    """One gff line with integer coordinates, interned columns and lazy attributes"""
+
+    __slots__ = ("seqid", "source", "type", "start", "end", "score", "strand", "phase", "attributes", "_attr")
+
+    def __init__(self, seqid, source, type, start, end, score, strand, phase, attributes):
+
+        self.seqid = sys.intern(seqid)
+        self.source = sys.intern(source)
+        self.type = sys.intern(type)
+        self.start = int(start)
+        self.end = int(end)
+        self.score = sys.intern(score)
+        self.strand = sys.intern(strand)
+        self.phase = sys.intern(phase)
+        self.attributes = attributes
+        self._attr = None
+
+    @classmethod
+    def from_line(cls, line):
+
+        return cls(*line[:9])
+
+    @property
+    def attr(self):
+        """The whole attribute mapping, parsed on first use"""
+
+        if self._attr is None:
+            self._attr = split_attr(self.attributes)
+
+        return self._attr
+
+    def get(self, *keys):
+        """Only extract the given tags, without building the whole mapping"""
+
+        if self._attr is not None:
+            return {i: self._attr[i] for i in keys if i in self._attr}
+
+        return get_attr(self.attributes, keys)
+
+    def __len__(self):
+
+        return self.end - self.start + 1
+
+    def to_list(self):
+
+        return [self.seqid, self.source, self.type, str(self.start), str(self.end),
+            self.score, self.strand, self.phase, self.attributes]
+
+    def __str__(self):
+
+        return "\t".join(self.to_list())
+
+
+def read_feature(file, types=None):
+    """Read the gff file as Feature, optionally only the given feature types"""
+
+    fh = open_file(file)
+
+    try:
+        for line in fh:
+            line = line.decode("utf-8").strip()
+            if not line or line.startswith("#"):
+                continue
+            line = line.split("\t")
+            if len(line) < 9:
+                LOG.info("%r is not a gff line" % "\t".join(line))
+                continue
+            if types and line[2] not in types:
+                continue
+            yield Feature.from_line(line)
+    finally:
+        fh.close()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import hashlib
+import marshal
+import logging
+
+from fastx import open_file
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "invicoun@foxmail.com"
+__all__ = ["read_function", "load_function", "FunctionTable"]
+
+CACHE_VERSION = 2
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "gffvert")
+
+
+def read_tsv(file, sep="\t"):
+
+    fh = open_file(file)
+
+    try:
+        for line in fh:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            line = line.strip()
+
+            if not line or line.startswith("#"):
+                continue
+
+            yield line.split(sep)
+    finally:
+        fh.close()
+
+
+def get_best_gene(gstr):
+
+    r = ""
+    for i in gstr.split(","):
+        if not i:
+            continue
+        if len(i) <= 4 or len(i) >5:
+            continue
+        r = i
+
+    return r
+
+
+def iter_function(file):
+    """Resolve each line of merge.function.xls to (gene_id, gene, product)"""
+
+    for line in read_tsv(file, sep="\t"):
+        gene_id = line[0]
+        gene = line[2]
+        if gene == "-":
+            gene = ""
+        gene = gene.replace(" ", "").replace("-", "").replace(",,", ",").strip(",")
+        gene = get_best_gene(gene)
+        func = line[3]
+        if func == "-":
+            func = line[6]
+        if func == "-":
+            func = line[10]
+        if func == "-":
+            func = line[13]
+        if func == "-":
+            func = line[16]
+        if func == "-":
+            func = "hypothetical protein"
+        yield gene_id, gene, func
+
+
+def read_function(file):
+
+    r = {}
+
+    for gene_id, gene, func in iter_function(file):
+        r[gene_id] = [gene, func]
+
+    return r
+
+
+def get_stamp(file):
+    """Version of the cache format and the python (marshal), path, size and mtime of the table"""
+
+    stat = os.stat(file)
+
+    return "%s.%s.%s.%s\t%s\t%s\t%s" % (CACHE_VERSION, marshal.version, sys.version_info[0], sys.version_info[1],
+        os.path.abspath(file), stat.st_size, stat.st_mtime_ns)
+
+
+def get_cache(file, cache_dir=CACHE_DIR):
+
+    name = hashlib.sha1(os.path.abspath(file).encode("utf-8")).hexdigest()
+
+    return os.path.join(cache_dir, "%s.function.marshal" % name)
+
+
+def build_cache(file, cache, stamp):
+    """Compile the resolved table into three columns in a marshal file, replaced atomically"""
+
+    ids, genes, funcs = [], [], []
+
+    for gene_id, gene, func in iter_function(file):
+        ids.append(gene_id)
+        genes.append(gene)
+        funcs.append(func)
+
+    temp = "%s.%s.tmp" % (cache, os.getpid())
+    try:
+        with open(temp, "wb") as fh:
+            fh.write(marshal.dumps((stamp, ids, genes, funcs)))
+        os.replace(temp, cache)
+    finally:
+        if os.path.exists(temp): #Only left when the build failed
+            os.remove(temp)
+
+    return ids, genes, funcs
+
+
+def read_cache(cache, stamp):
+    """The columns of the compiled table, None when it is missing or stale"""
+
+    try:
+        with open(cache, "rb") as fh:
+            data = marshal.loads(fh.read()) #One read, marshal.load reads a file in small pieces
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, tuple) or len(data) != 4 or data[0] != stamp:
+        return None
+
+    return data[1:]
+
+
+class FunctionTable(object):
+    """Read-only mapping of gene id to [gene, product] backed by the compiled cache
+
+    The columns are loaded in one read and only indexed by gene id, the
+    [gene, product] lists are made on lookup.
+    """
+
+    def __init__(self, file, cache_dir=CACHE_DIR):
+
+        self.file = file
+        self.cache = get_cache(file, cache_dir)
+        stamp = get_stamp(file)
+        columns = read_cache(self.cache, stamp)
+
+        if columns is None:
+            LOG.info("Compile %s to %s" % (file, self.cache))
+            os.makedirs(cache_dir, exist_ok=True)
+            columns = build_cache(file, self.cache, stamp)
+        ids, self.genes, self.funcs = columns
+        self.index = dict(zip(ids, range(len(ids)))) #Later rows win, as in read_function
+
+    def get(self, gene_id, default=None):
+
+        i = self.index.get(gene_id)
+        if i is None:
+            return default
+
+        return [self.genes[i], self.funcs[i]]
+
+    def __contains__(self, gene_id):
+
+        return gene_id in self.index
+
+    def __getitem__(self, gene_id):
+
+        i = self.index[gene_id]
+
+        return [self.genes[i], self.funcs[i]]
+
+    def __len__(self):
+
+        return len(self.index)
+
+
+def load_function(file, cache=True, cache_dir=CACHE_DIR):
+    """Use the compiled cache when possible, otherwise read the whole table"""
+
+    if not cache:
+        return read_function(file)
+
+    try:
+        return FunctionTable(file, cache_dir)
+    except OSError as error:
+        LOG.info("Cannot use the function cache in %s: %s" % (cache_dir, error))
+
+    return read_function(file)
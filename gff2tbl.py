@@ -4,11 +4,13 @@
 import os
 import re
 import sys
-import gzip
 import logging
 import argparse
 
-import collections
+from fastx import bgzip_output
+from function_cache import load_function
+from feature import read_feature
+from profiler import PROFILE, add_profile_args, start_profile, finish_profile
 
 LOG = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO) #初始化时，如果没指定level，那么level的默认级别为WARNING
@@ -19,165 +21,110 @@ __email__ = "invicoun@foxmail.com"
 __all__ = []
 
 
-def read_tsv(file, sep=None):
-
-    """读取表格文件"""
-    if file.endswith(".gz"):
-        fh = gzip.open(file)
-    else:
-        fh = open(file)
-
-    for line in fh:
-        if isinstance(line, bytes):
-            line = line.decode("utf-8")
-        line = line.strip()
-
-        if not line or line.startswith("#"): #跳过空行和首字母为#的行
+def read_gff2gene(file):
+    """Yield one gene at a time as [gene, gene id, [[mRNA id, mRNA, CDS], ...]] of Feature
+
+    The attributes of every line are parsed once. Lines that do not belong to
+    the current gene are reported and skipped instead of stopping the reading.
+    """
+
+    gene = None
+    mrna = {}
+
+    for line in read_feature(file, ("gene", "mRNA", "CDS")):
+        attr = line.get("ID", "Parent")
+        if line.type == "gene":
+            if gene:
+                yield gene
+            gene = None
+            mrna = {}
+            if "ID" not in attr:
+                LOG.info("Gene at %s:%s-%s has no ID" % (line.seqid, line.start, line.end))
+                continue
+            gene = [line, attr["ID"], []]
             continue
-
-        yield line.split(sep)
-
-    fh.close()
-
-
-def get_best_gene(gstr):
- 
-    r = ""
-    for i in gstr.split(","):
-        if not i:
+        if gene is None:
             continue
-        if len(i) <= 4 or len(i) >5:
+        if line.type == "mRNA":
+            if gene[1] != attr.get("Parent") or "ID" not in attr:
+                LOG.info("mRNA %s does not belong to gene %s" % (attr.get("ID", ""), gene[1]))
+                continue
+            mrna[attr["ID"]] = [attr["ID"], line, []]
+            gene[2].append(mrna[attr["ID"]])
             continue
-        r = i
-
-    return r
-
-
-def read_function(file):
-
-    r = {}
+        parent = attr.get("Parent")
+        if parent not in mrna:
+            LOG.info("CDS of %s does not belong to gene %s" % (parent, gene[1]))
+            continue
+        mrna[parent][2].append(line)
 
-    for line in read_tsv(file, sep="\t"):
-        gene_id = line[0]
-        gene = line[2]
-        if gene == "-":
-            gene = ""
-        gene = gene.replace(" ", "").replace("-", "").replace(",,", ",").strip(",")
-        gene = get_best_gene(gene)
-        func = line[3]
-        if func == "-":
-            func = line[6]
-        if func == "-":
-            func = line[10]
-        if func == "-":
-            func = line[13]
-        if func == "-":
-            func = line[16]
-        if func == "-":
-            func = "hypothetical protein"
-        r[gene_id] = [gene, func]
+    if gene:
+        yield gene
 
-    return r
 
+def format_gene(gene, r):
 
-def split_attr(attributes, sep="="):
+    line, geneid, mrnas = gene
+    mrnas = [i for i in mrnas if i[2]]
+    if not mrnas:
+        LOG.info("Gene %s has no mRNA or CDS information" % geneid)
+        return ""
 
-    """分割gff文件中的最后一列"""
-    r = collections.OrderedDict()
-    contents = attributes.split(";")
+    funcs = [r.get(i[0]) or ["", "hypothetical protein"] for i in mrnas]
+    gene_nane = funcs[0][0]
+    if gene_nane:
+        gene_nane = "\n\t\tgene\t%s" % gene_nane
 
-    for content in contents:
-        if not content:
-            continue
-        if sep not in content:
-            LOG.info("%r is not a good formated attribute: no tag!" % content)
-            continue
-        tag, value = content.strip().split(sep, 1)
-        r[tag] = value.strip('"')
+    temp = ["{start}\t{end}\tgene{gene}\n\t\tlocus_tag\t{locus_tag}\n".format(start=line.start,
+        end=line.end, gene=gene_nane, locus_tag=geneid)]
+    for (mrnaid, mrna, cds), (gene_nane, func) in zip(mrnas, funcs):
+        ctype = "\tCDS"
+        for i in cds:
+            if i.strand == "-":
+                temp.append("%s\t%s%s\n" % (i.end, i.start, ctype))
+            else:
+                temp.append("%s\t%s%s\n" % (i.start, i.end, ctype))
+            ctype = ""
+        temp.append("\t\tproduct\t%s\n\t\tprotein_id\t%s\n" % (func, mrnaid))
 
-    return r
+    return "".join(temp)
 
 
-def read_gff2gene(file):
+def gff2tbl(gff, function, cache=True, issorted=False, buffer=1 << 20):
 
-    gene = []
-    mrna_dict = {}
-    cds_dict = {}
-    geneid = ""
-    parent = ""
-
-    for line in read_tsv(file, "\t"):
-        if line[2] == "gene":
-            gene.append(line)
-            attr = split_attr(line[-1])
-            geneid = attr["ID"]
-            continue
-        if line[2] == "mRNA":
-            attr = split_attr(line[-1])
-            if geneid != attr["Parent"]:
-                LOG.info("Gene %s has no mRNA information" % geneid)
-                break
-            parent = attr["ID"]
-            if geneid not in mrna_dict:
-                mrna_dict[geneid] = line
-
-        if line[2] == "CDS":
-            attr = split_attr(line[-1])
-            if parent != attr["Parent"]:
-                LOG.info("Gene %s has no CDS information" % geneid)
-                break
-            if geneid not in cds_dict:
-                cds_dict[geneid] = []
-            cds_dict[geneid].append(line)
-
-    return gene, mrna_dict, cds_dict
-
-
-def gff2tbl(gff, function):
-
-    r = read_function(function)
-    gene, mrna_dict, cds_dict = read_gff2gene(gff)
+    with PROFILE.stage("load_function"):
+        r = load_function(function, cache)
+    genes = PROFILE.iterate("read_gff", read_gff2gene(gff))
+    if not issorted:
+        with PROFILE.stage("sort") as stage:
+            genes = sorted(genes, key=lambda x:(x[0].seqid, x[0].start, x[0].end))
+            stage.records += len(genes)
     seqid = ""
-
-    for line in sorted(gene, key = lambda x:(x[0], int(x[3]), int(x[4]))):
-        attr = split_attr(line[-1])
-        geneid = attr["ID"]
-        if geneid not in cds_dict:
-            LOG.info("Gene %s has no CDS information" % geneid)
-            break
-        if geneid not in mrna_dict:
-           LOG.info("Gene %s has no mRNA information" % geneid)
-           break
-        if line[0] != seqid:
-            print(">Feature %s" % line[0])
-            seqid = line[0]
-        strand = line[6]
-        mrna = mrna_dict[geneid]
-        mrnaid = split_attr(mrna[-1])["ID"]
-
-        gene_nane = ""
-        func = "hypothetical protein"
-        if mrnaid in r:
-            gene_nane = r[mrnaid][0]
-            func = r[mrnaid][1]
-        if gene_nane:
-            gene_nane = "\n\t\tgene\t%s" % gene_nane
-
-        print("{start}\t{end}\tgene{gene}\n\t\tlocus_tag\t{locus_tag}".format(start=line[3],
-            end=line[4], gene=gene_nane, locus_tag=geneid))
-        temp = []
-        for line in cds_dict[geneid]:
-            if line[6] == "-":
-                temp.append((line[4], line[3]))
-            else:
-                temp.append((line[3], line[4]))
-        #if strand == "-":
-        #    temp = temp[::-1]
-        print("%s\t%s\tCDS" % (temp[0][0], temp[0][1]))
-        for i in temp[1::]:
-            print("%s\t%s" % (i[0], i[1]))
-        print("\t\tproduct\t%s\n\t\tprotein_id\t%s" % (func, mrnaid))
-        
+    seen = set()
+    temp = []
+    size = 0
+
+    for gene in genes:
+        line = gene[0]
+        record = format_gene(gene, r)
+        if not record:
+            continue
+        if line.seqid != seqid:
+            if line.seqid in seen:
+                LOG.info("Sequence %s appears again, the input is not sorted" % line.seqid)
+            seen.add(line.seqid)
+            seqid = line.seqid
+            record = ">Feature %s\n%s" % (seqid, record)
+        temp.append(record)
+        size += len(record)
+        if size >= buffer:
+            with PROFILE.stage("write"):
+                sys.stdout.write("".join(temp))
+            temp = []
+            size = 0
+
+    with PROFILE.stage("write"):
+        sys.stdout.write("".join(temp))
 
     return 0
 
@@ -188,6 +135,13 @@ def add_help_args(parser):
         help="Input gff file")
     parser.add_argument("-f", "--function", metavar="FILE", type=str, required=True,
         help="Input gene function annotation results, merge.function.xls.")
+    parser.add_argument("--sorted", action="store_true",
+        help="The gff file is sorted by sequence and position, write the table while reading.")
+    parser.add_argument("--no_cache", action="store_true",
+        help="Do not compile the function table into the cache (~/.cache/gffvert).")
+    parser.add_argument("--bgzip", action="store_true",
+        help="Write the output in BGZF format.")
+    add_profile_args(parser)
 
     return parser
 
@@ -212,7 +166,10 @@ contact:  %s <%s>\
 
     args = add_help_args(parser).parse_args()
 
-    gff2tbl(args.input, args.function)
+    with bgzip_output(args.bgzip):
+        start_profile(args, [args.input, args.function])
+        gff2tbl(args.input, args.function, not args.no_cache, args.sorted)
+        finish_profile()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import logging
+import collections
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "invicoun@foxmail.com"
+__all__ = ["split_attr", "get_attr"]
+
+WARN_LIMIT = 10 #Only the first bad attributes are logged one by one
+BAD_ATTR = collections.Counter()
+
+
+def warn_attr(content):
+
+    BAD_ATTR["total"] += 1
+    if BAD_ATTR["total"] <= WARN_LIMIT:
+        LOG.info("%r is not a good formated attribute: no tag!" % content)
+    if BAD_ATTR["total"] == WARN_LIMIT:
+        LOG.info("Further bad attributes are counted but not reported")
+
+
+@atexit.register
+def report_bad_attr():
+
+    if BAD_ATTR["total"] > WARN_LIMIT:
+        LOG.info("%s attributes are not well formated in total" % BAD_ATTR["total"])
+
+
+def split_attr(attributes, sep="="):
+
+    """分割gff文件中的最后一列"""
+    r = collections.OrderedDict()
+    contents = attributes.split(";")
+
+    for content in contents:
+        if not content:
+            continue
+        if sep not in content:
+            warn_attr(content)
+            continue
+        tag, value = content.strip().split(sep, 1)
+        r[tag] = value.strip('"')
+
+    return r
+
+
+def get_attr(attributes, keys=("ID", "Parent"), sep="="):
+    """Only extract the given tags, same values as split_attr without building the whole mapping"""
+
+    r = {}
+
+    for content in attributes.split(";"):
+        tag, found, value = content.partition(sep)
+        if not found:
+            continue
+        if tag not in keys:
+            tag = tag.lstrip()
+            if tag not in keys:
+                continue
+        r[tag] = value.rstrip().strip('"')
+
+    return r
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import cProfile
+import logging
+import resource
+import collections
+
+from contextlib import contextmanager
+
+LOG = logging.getLogger(__name__)
+
+__version__ = "1.0.0"
+__author__ = ("Xingguo Zhang",)
+__email__ = "invicoun@foxmail.com"
+__all__ = ["PROFILE", "add_profile_args", "start_profile", "finish_profile"]
+
+
+class Stage(object):
+
+    __slots__ = ("wall", "cpu", "records", "calls")
+
+    def __init__(self):
+
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.records = 0
+        self.calls = 0
+
+
+class CountWriter(object):
+    """Count the characters printed to stdout, before any encoding or BGZF compression"""
+
+    def __init__(self, fh):
+
+        self.fh = fh
+        self.chars = 0
+
+    def write(self, data):
+
+        self.chars += len(data)
+
+        return self.fh.write(data)
+
+    def __getattr__(self, name):
+
+        return getattr(self.fh, name)
+
+
+class Profiler(object):
+    """Per-stage wall/cpu time and record counts, reported as json"""
+
+    def __init__(self):
+
+        self.enabled = False
+        self.stats = None
+        self.profile = None
+        self.stages = collections.OrderedDict()
+        self.inputs = []
+        self.output = None
+        self.stack = []
+        self.profiler = None
+        self.profiling = False
+        self.wall = time.time()
+        self.cpu = time.process_time()
+
+    def enable(self, stats="-", profile=None, inputs=()):
+
+        self.enabled = True
+        self.profiler = cProfile.Profile() if profile else None
+        self.stats = stats
+        self.profile = profile
+        self.inputs = [i for i in inputs if i and os.path.isfile(i)]
+        self.output = CountWriter(sys.stdout)
+        sys.stdout = self.output
+        self.wall = time.time()
+        self.cpu = time.process_time()
+
+    def get_stage(self, name):
+
+        if name not in self.stages:
+            self.stages[name] = Stage()
+
+        return self.stages[name]
+
+    def enter(self, name):
+
+        frame = [0.0, 0.0, time.time(), time.process_time(), None]
+        if name == self.profile and not self.profiling:
+            frame[4] = True
+            self.profiling = True
+            self.profiler.enable()
+        self.stack.append(frame)
+
+        return frame
+
+    def exit(self, stage, frame):
+        """Nested stages are only counted in the innermost one"""
+
+        self.stack.pop()
+        wall = time.time() - frame[2]
+        cpu = time.process_time() - frame[3]
+        if frame[4]:
+            self.profiler.disable()
+            self.profiling = False
+        stage.wall += wall - frame[0]
+        stage.cpu += cpu - frame[1]
+        stage.calls += 1
+        if self.stack:
+            self.stack[-1][0] += wall
+            self.stack[-1][1] += cpu
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of code, add to .records of the yielded Stage to count records"""
+
+        if not self.enabled:
+            yield Stage()
+            return
+        stage = self.get_stage(name)
+        frame = self.enter(name)
+        try:
+            yield stage
+        finally:
+            self.exit(stage, frame)
+
+    def iterate(self, name, iterable):
+        """Time the production of every item of a (streaming) iterable as one stage"""
+
+        if not self.enabled:
+            return iterable
+
+        return self._iterate(name, iter(iterable))
+
+    def _iterate(self, name, iterable):
+
+        stage = self.get_stage(name)
+        while True:
+            frame = self.enter(name)
+            try:
+                item = next(iterable)
+            except StopIteration:
+                return
+            finally:
+                self.exit(stage, frame)
+            stage.records += 1
+            yield item
+
+    def dump_profile(self):
+
+        if self.profile not in self.stages:
+            LOG.info("Stage %s was not run, no cProfile is written" % self.profile)
+            return
+        self.profiler.dump_stats("%s.prof" % self.profile)
+        LOG.info("Write the cProfile of stage %s to %s.prof" % (self.profile, self.profile))
+
+    def report(self):
+
+        r = collections.OrderedDict()
+        r["command"] = os.path.basename(sys.argv[0])
+        r["wall"] = round(time.time()-self.wall, 4)
+        r["cpu"] = round(time.process_time()-self.cpu, 4)
+        r["input_file_size"] = sum(os.path.getsize(i) for i in self.inputs) #On disk, compressed for .gz
+        r["output_chars"] = self.output.chars if self.output else 0 #Text printed, not the BGZF bytes
+        r["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        r["stages"] = collections.OrderedDict()
+        for name, stage in self.stages.items():
+            r["stages"][name] = {
+                "wall": round(stage.wall, 4),
+                "cpu": round(stage.cpu, 4),
+                "calls": stage.calls,
+                "records": stage.records,
+                "records_per_sec": round(stage.records/stage.wall, 1) if stage.wall else 0,
+            }
+
+        return r
+
+
+PROFILE = Profiler()
+
+
+def add_profile_args(parser):
+
+    parser.add_argument("--stats", metavar="FILE", nargs="?", const="-", default=None,
+        help="Report the time, records and memory of every stage as json to FILE, default to stderr.")
+    parser.add_argument("--profile", metavar="STAGE", type=str, default=None,
+        help="Write the cProfile of one stage to STAGE.prof (view with python -m pstats).")
+
+    return parser
+
+
+def start_profile(args, inputs=()):
+
+    if args.stats or args.profile:
+        PROFILE.enable(args.stats, args.profile, inputs)
+
+    return PROFILE
+
+
+def finish_profile():
+
+    if not PROFILE.enabled:
+        return
+    if sys.stdout is PROFILE.output:
+        sys.stdout = PROFILE.output.fh
+    sys.stdout.flush()
+    if PROFILE.profile:
+        PROFILE.dump_profile()
+    if not PROFILE.stats:
+        return
+
+    report = json.dumps(PROFILE.report(), indent=2)
+    if PROFILE.stats == "-":
+        sys.stderr.write("%s\n" % report)
+    else:
+        with open(PROFILE.stats, "w") as fh:
+            fh.write("%s\n" % report)
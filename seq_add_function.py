@@ -4,10 +4,13 @@
 import os
 import re
 import sys
-import gzip
 import logging
 import argparse
 
+from fastx import open_file, bgzip_output
+from function_cache import load_function
+from profiler import PROFILE, add_profile_args, start_profile, finish_profile
+
 LOG = logging.getLogger(__name__)
 
 __version__ = "1.0.2"
@@ -16,96 +19,42 @@ __email__ = "invicoun@foxmail.com"
 __all__ = []
 
 
-def read_tsv(file, sep="\t"):
-
-    if file.endswith(".gz"):
-        fh = gzip.open(file)
-    else:
-        fh = open(file)
-
-    for line in fh:
-        if isinstance(line, bytes):
-            line = line.decode("utf-8")
-        line = line.strip()
-
-        if not line or line.startswith("#"):
-            continue
-
-        yield line.split(sep)
-
-    fh.close()
-
-
-def get_best_gene(gstr):
- 
-    r = ""
-    for i in gstr.split(","):
-        if not i:
-            continue
-        if len(i) <= 4 or len(i) >5:
-            continue
-        r = i
-
-    return r
-
-
-def read_function(file):
-
-    r = {}
-
-    for line in read_tsv(file, sep="\t"):
-        gene_id = line[0]
-        gene = line[2]
-        if gene == "-":
-            gene = ""
-        gene = gene.replace(" ", "").replace("-", "").replace(",,", ",").strip(",")
-        gene = get_best_gene(gene)
-        func = line[3]
-        if func == "-":
-            func = line[6]
-        if func == "-":
-            func = line[10]
-        if func == "-":
-            func = line[13]
-        if func == "-":
-            func = line[16]
-        if func == "-":
-            func = "hypothetical protein"
-        r[gene_id] = [gene, func]
-
-    return r
-
-
-def seq_add_function(file, function, origin="Unknown"):
+def seq_add_function(file, function, origin="Unknown", cache=True):
 
-    r = read_function(function)
+    with PROFILE.stage("load_function"):
+        r = load_function(function, cache)
 
     if file.endswith(".gz"):
-        fp = gzip.open(file)
+        fp = open_file(file)
     elif file.endswith(".fasta") or file.endswith(".fa") or file.endswith(".faa") or file.endswith(".fna"):
         fp = open(file)
     else:
         raise Exception("%r file format error" % file)
-    for line in fp:
-        if isinstance(line, bytes):
-            line = line.decode("utf-8")
-        line = line.strip()
-        if line.startswith(">"):
-            seqid = line.strip(">").split()[0]
-            temp = ""
-            if seqid in r:
-                gene, func = r[seqid]
-                if gene != "":
-                    temp = "[gene=%s]" % gene
-                if func != "":
-                    temp = "%s [protein=%s]" % (temp, func)
-                if origin:
-                    temp = "%s [organism=%s]" % (temp, origin)
-                temp = temp.replace("  ", "").strip()
-            line = "%s %s" % (line.split()[0], temp)
-            line = line.strip()
-                  
-        print(line)
+    try:
+        with PROFILE.stage("annotate") as stage:
+            for line in fp:
+                if isinstance(line, bytes):
+                    line = line.decode("utf-8")
+                line = line.strip()
+                if line.startswith(">"):
+                    seqid = line.strip(">").split()[0]
+                    temp = ""
+                    if seqid in r:
+                        gene, func = r[seqid]
+                        if gene != "":
+                            temp = "[gene=%s]" % gene
+                        if func != "":
+                            temp = "%s [protein=%s]" % (temp, func)
+                        if origin:
+                            temp = "%s [organism=%s]" % (temp, origin)
+                        temp = temp.replace("  ", "").strip()
+                    line = "%s %s" % (line.split()[0], temp)
+                    line = line.strip()
+
+                print(line)
+                stage.records += 1
+    finally:
+        fp.close()
 
     return 0
 
@@ -118,6 +67,11 @@ def add_help_args(parser):
         help="Input gene function annotation results, PVgenome.merge.function.xls.")
     parser.add_argument("-or", "--origin", metavar="FILE", type=str, default="Unknown",
         help="Input origin species information")
+    parser.add_argument("--no_cache", action="store_true",
+        help="Do not compile the function table into the cache (~/.cache/gffvert).")
+    parser.add_argument("--bgzip", action="store_true",
+        help="Write the output in BGZF format.")
+    add_profile_args(parser)
 
     return parser
 
@@ -142,7 +96,10 @@ contact:  %s <%s>\
 
     args = add_help_args(parser).parse_args()
 
-    seq_add_function(args.input, args.function, args.origin)
+    with bgzip_output(args.bgzip):
+        start_profile(args, [args.input, args.function])
+        seq_add_function(args.input, args.function, args.origin, not args.no_cache)
+        finish_profile()
 
 
 if __name__ == "__main__":
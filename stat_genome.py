@@ -2,11 +2,18 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
 import sys
-import gzip
 import logging
 import argparse
 
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+from fastx import read_fasta, read_fastq, bgzip_output
+from profiler import PROFILE, add_profile_args, start_profile, finish_profile
+
 LOG = logging.getLogger(__name__)
 
 __version__ = "v1.0.0"
@@ -14,83 +21,23 @@ __author__ = ("Xingguo Zhang",)
 __email__ = "1131978210@qq.com"
 __all__ = []
 
-
-def read_fasta(file):
-    '''Read fasta file'''
-
-    if file.endswith(".gz"):
-        fp = gzip.open(file)
-    elif file.endswith(".fasta") or file.endswith(".fa"):
-        fp = open(file)
-    else:
-        raise Exception("%r file format error" % file)
-
-    seq = ''
-    for line in fp:
-        if type(line) == type(b''):
-            line = line.decode('utf-8')
-
-        line = line.strip()
-        if not line:
-            continue
-        if line.startswith(">"):
-            line = line.strip(">").split()[0]
-            if seq:
-                yield seq.split('\n')
-            seq = "%s\n" % line
-        else:
-            seq += line
-    if seq:
-        yield seq.split('\n')
-    fp.close()
-
-
-def read_fastq(file):
-    '''Read fastq file'''
-    if file.endswith(".gz"):
-        fp = gzip.open(file)
-    elif file.endswith(".fastq") or file.endswith(".fq"):
-        fp = open(file)
-    else:
-        raise Exception("%r file format error" % file)
-
-    seq = []
-    for line in fp:
-        if type(line) == type(b''):
-            line = line.decode('utf-8')
-        line = line.strip()
-
-        if not line:
-            continue
-        if not seq:
-            seq.append(line.strip("@"))
-            continue
-        seq.append(line)
-
-        if len(seq)==4:
-            yield seq
-            seq = []
-    fp.close()
+CONTIG_RE = re.compile(rb"[^Nn]+")
 
 
 def scaff2contig(seq):
+    """Return the contig lengths, gap number and gap length of a scaffold"""
 
-    seq = seq.upper()
-    r = []
-    gaplen = seq.count('N')
-
-    for i in seq.split("N"):
-        if len(i) == 0:
-            continue
-        r.append(i)
+    r = array("q", (m.end()-m.start() for m in CONTIG_RE.finditer(seq)))
+    gaplen = seq.count(b"N") + seq.count(b"n")
 
     return r, len(r)-1, gaplen
 
 
 def read_seq(file):
+    """Record only the lengths of scaffolds and contigs, never the sequences"""
 
-    scaff = {}
-    contig = {}
+    scaff = [array("q"), array("q"), array("q")] #length, gap number, gap length
+    contig = array("q")
 
     if file.endswith(".fastq") or file.endswith(".fq") or file.endswith(".fastq.gz") or file.endswith(".fq.gz"):
         fh = read_fastq(file)
@@ -99,55 +46,49 @@ def read_seq(file):
     else:
         raise Exception("%r file format error" % file)
 
-    for line in fh:
-        seq = line[1].upper()
+    for line in PROFILE.iterate("read", fh):
+        seq = line[1]
         seqs, gap, gaplen = scaff2contig(seq)
-        scaff[line[0]] = [seq, gap, gaplen]
-
-        if len(seqs)==1:
-            contig[line[0]] = [seqs[0], 0, 0]
-        else:
-            n = 0
-            for i in seqs:
-                n += 1
-                contig["%s_%s" % (line[0], n)] = [i, 0, 0]
+        scaff[0].append(len(seq))
+        scaff[1].append(gap)
+        scaff[2].append(gaplen)
+        contig.extend(seqs)
 
     return scaff, contig
 
 
-def stat_length(data):
+def stat_length(lengths, gaps=None, gaplens=None):
 
     r = {}
 
-    for i in data:
-        line = data[i]
-        seq, gap, gaplen = line
-        seqlen = len(seq)
+    for i, seqlen in enumerate(lengths):
+        gap = gaps[i] if gaps else 0
+        gaplen = gaplens[i] if gaplens else 0
 
         if seqlen >= 1000:
             if "Length>=1kb" not in r:
                 r["Length>=1kb"] = [0, 0, 0, 0]
-            r["Length>=1kb"][0] += len(seq)
+            r["Length>=1kb"][0] += seqlen
             r["Length>=1kb"][1] += 1
             r["Length>=1kb"][2] += gaplen
             r["Length>=1kb"][3] += gap
         if seqlen >= 2000:
             if "Length>=2kb" not in r:
                 r["Length>=2kb"] = [0, 0, 0, 0]
-            r["Length>=2kb"][0] += len(seq)
+            r["Length>=2kb"][0] += seqlen
             r["Length>=2kb"][1] += 1
             r["Length>=2kb"][2] += gaplen
             r["Length>=2kb"][3] += gap
         if seqlen >= 5000:
             if "Length>=5kb" not in r:
                 r["Length>=5kb"] = [0, 0, 0, 0]
-            r["Length>=5kb"][0] += len(seq)
+            r["Length>=5kb"][0] += seqlen
             r["Length>=5kb"][1] += 1
             r["Length>=5kb"][2] += gaplen
             r["Length>=5kb"][3] += gap
         if "Total" not in r:
             r["Total"] = [0, 0, 0, 0]
-        r["Total"][0] += len(seq)
+        r["Total"][0] += seqlen
         r["Total"][1] += 1
         r["Total"][2] += gaplen
         r["Total"][3] += gap
@@ -155,44 +96,31 @@ def stat_length(data):
     return r
 
 
-def nx0(sumlen, data, x="N50"):
-
-    dlen = {"Longest":0, "N50":0.5, "N60":0.6, "N70":0.7, "N80":0.8, "N90": 0.9}
-    r = {}
-    contlen = 0
-
-    for line in sorted(data.items(), key=lambda x:x[1][0], reverse=True):
-        seqlen, gap, gaplen = line[1]
-        contlen += seqlen
-        if x not in r:
-            r[x] = [0, 0, 0, 0]
-        r[x][1] += 1
-        r[x][2] += gaplen
-        r[x][3] += gap
-
-        if contlen >= sumlen*dlen[x]:
-            if seqlen >= r[x][0]:
-                r[x][0] = seqlen
-            else:
-                r[x][1] += -1
-                r[x][2] += -gaplen
-                r[x][3] += -gap
-                break
-    return r
-
+def stat_quality(lengths, gaps=None, gaplens=None):
+    """Stat Longest and N50-N90 with a single sort of the lengths and cumulative sums
 
-def stat_quality(data):
+    Sequences of the same length are counted together, so the gaps of a
+    Nx are summed over the sequences at least that long and the gap
+    arrays are not sorted along.
+    """
 
-    sumlen = 0
-    for i in data:
-        sumlen += len(data[i][0])
-        data[i][0] = len(data[i][0])
+    dlen = [("Longest", 0), ("N50", 0.5), ("N60", 0.6), ("N70", 0.7), ("N80", 0.8), ("N90", 0.9)]
+    sortlen = array("q", sorted(lengths, reverse=True))
+    cumlen = array("q", accumulate(sortlen))
 
     r = {}
-    dlen = ["Longest", "N50", "N60", "N70", "N80", "N90"]
-
-    for x in dlen:
-        r.update(nx0(sumlen, data, x))
+    if not sortlen:
+        return r
+    sumlen = cumlen[-1]
+
+    for x, ratio in dlen:
+        n = bisect_left(cumlen, sumlen*ratio)
+        seqlen = sortlen[n]
+        while n+1 < len(sortlen) and sortlen[n+1] == seqlen: #Sequences with the same length are counted together
+            n += 1
+        gap = sum(j for i, j in zip(lengths, gaps) if i >= seqlen) if gaps else 0
+        gaplen = sum(j for i, j in zip(lengths, gaplens) if i >= seqlen) if gaplens else 0
+        r[x] = [seqlen, n+1, gaplen, gap]
 
     return r
 
@@ -218,16 +146,15 @@ def format_dict(data):
 
 def stat_genome(file):
 
-    scaff, contig = read_seq(file)
-    slen = format_dict(stat_length(scaff))
-    snx = format_dict(stat_quality(scaff))
-
-    if scaff != contig:
+    with PROFILE.stage("split") as stage:
+        scaff, contig = read_seq(file)
+        stage.records += len(scaff[0])
+    with PROFILE.stage("stat") as stage:
+        slen = format_dict(stat_length(*scaff))
+        snx = format_dict(stat_quality(*scaff))
         clen = format_dict(stat_length(contig))
         cnx = format_dict(stat_quality(contig))
-    else:
-        clen = slen
-        cnx = snx
+        stage.records += len(scaff[0]) + len(contig)
 
     print("""\
 #StatType\tContigLength\tContigNumber\tScaffoldLength\tScaffoldNumber\tGapLength\tGapNumber
@@ -258,6 +185,9 @@ def add_hlep_args(parser):
 
     parser.add_argument('input', metavar='FILE', type=str,
         help='Input the genome file.')
+    parser.add_argument('--bgzip', action='store_true',
+        help='Write the output in BGZF format.')
+    add_profile_args(parser)
 
     return parser
 
@@ -278,7 +208,10 @@ attention:
     stat_genome --fasta genome.fasta
 ''')
     args = add_hlep_args(parser).parse_args()
-    stat_genome(args.input)
+    with bgzip_output(args.bgzip):
+        start_profile(args, [args.input])
+        stat_genome(args.input)
+        finish_profile()
 
 
 if __name__ == "__main__":
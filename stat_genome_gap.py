@@ -2,11 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
 import sys
-import gzip
 import logging
 import argparse
 
+from fastx import read_fasta, read_fastq, bgzip_output
+from profiler import PROFILE, add_profile_args, start_profile, finish_profile
+
 LOG = logging.getLogger(__name__)
 
 __version__ = "v1.1.0"
@@ -14,111 +17,66 @@ __author__ = ("Xingguo Zhang",)
 __email__ = "113178210@qq.com"
 __all__ = []
 
+GAP_BASES = "Nn"
+IUPAC_BASES = "NnRrYyKkMmSsWwBbDdHhVv"
 
-def read_fasta(file):
-    '''Read fasta file'''
-
-    if file.endswith(".gz"):
-        fp = gzip.open(file)
-    elif file.endswith(".fasta") or file.endswith(".fa"):
-        fp = open(file)
-    else:
-        raise Exception("%r file format error" % file)
 
-    seq = ''
+def compile_gap(iupac=False):
 
-    for line in fp:
-        line = line.strip()
-
-        if not line:
-            continue
-        if not seq:
-            seq += "%s\n" % line.strip(">").split()[0]
-            continue
-        if line.startswith(">"):
-            line = line.strip(">").split()[0]
-            seq = seq.split('\n')
+    bases = IUPAC_BASES if iupac else GAP_BASES
 
-            yield seq[0], seq[1]
-            seq = ''
-            seq += "%s\n" % line
-        else:
-            seq += line
-
-    seq = seq.split('\n')
-    if len(seq)==2:
-        yield seq[0], seq[1]
-
-
-def read_fastq(file):
-    '''Read fastq file'''
-
-    if file.endswith(".gz"):
-        fp = gzip.open(file)
-    elif file.endswith(".fastq") or file.endswith(".fq"):
-        fp = open(file)
-    else:
-        raise Exception("%r file format error" % file)
+    return re.compile("[%s]+" % bases), re.compile(("[%s]+" % bases).encode())
 
-    seq = ''
 
-    for line in fp:
-        line = line.strip()
+def find_gap(seq, pattern):
+    """Jump between gaps with find (memchr) and only match the gap runs"""
 
-        if not line:
-            continue
-        if not seq:
-            seq += "%s\n" % line.strip("@").split()[0]
-            continue
-        if line.startswith('@'):
-            line = line.strip("@").split()[0]
-            seq = seq.split('\n')
+    upper, lower = ("N", "n") if isinstance(seq, str) else (b"N", b"n")
+    size = len(seq)
+    nextup = seq.find(upper)
+    nextlow = seq.find(lower)
 
-            yield seq[0], seq[1]
-            seq = ''
-            seq = "%s\n" % line
+    while nextup >= 0 or nextlow >= 0:
+        if nextup < 0:
+            start = nextlow
+        elif nextlow < 0:
+            start = nextup
         else:
-            seq += "%s\n" % line
-
-    if len(seq.split('\n'))==5:
-        seq = seq.split('\n')
-        yield seq[0], seq[1]
-
-
-def stat_gap(seq):
-
+            start = min(nextup, nextlow)
+        end = pattern.match(seq, start).end()
+        yield start, end
+        if end >= size:
+            break
+        if nextup >= 0 and nextup < end:
+            nextup = seq.find(upper, end)
+        if nextlow >= 0 and nextlow < end:
+            nextlow = seq.find(lower, end)
+
+
+def stat_gap(seq, minlen=1, iupac=False):
+    """Find the runs of N (1-based, closed intervals) in a str, bytes or mmap buffer"""
+
+    pattern = GAP_PATTERNS[iupac][0 if isinstance(seq, str) else 1]
+    if iupac:
+        gaps = (m.span() for m in pattern.finditer(seq))
+    else:
+        gaps = find_gap(seq, pattern)
     n = 0
-    start = 0
-    tep = ''
-    site = 0
     data = {}
 
-    for i in seq:
-        site +=1
-
-        if i!="N":
-            if tep=="" or tep!="N":
-                tep = i
-                continue
-            else:
-                tep = i
-                n += 1
-                data[n] = [start, site-1]
-        else:
-            if tep=="" or tep!="N":
-                tep = i
-                start = site
-            else:
-                tep = i
-                continue
-    if i=="N":
+    for start, end in gaps:
+        if end-start < minlen:
+            continue
         n += 1
-        data[n] = [start, site-1]
+        data[n] = [start+1, end]
 
     return data
 
 
-def stat_genome_gap(file):
+GAP_PATTERNS = {False: compile_gap(False), True: compile_gap(True)}
+
+
+def stat_genome_gap(file, minlen=1, iupac=False):
 
     if file.endswith(".fastq") or file.endswith(".fq") or file.endswith(".fastq.gz") or file.endswith(".fq.gz"):
         fh = read_fastq(file)
@@ -128,21 +86,30 @@ def stat_genome_gap(file):
         raise Exception("%r file format error" % file)
     
     print('#Seq id\tGap number\tGap start\tGap end\Gap length')
-    for seqid, seq in fh:
-        seq = seq.upper()
-        if "N" not in seq:
-            continue
-        gap_dict = stat_gap(seq)
+    for line in PROFILE.iterate("read", fh):
+        seqid, seq = line[0], line[1]
+        with PROFILE.stage("scan") as stage:
+            gap_dict = stat_gap(seq, minlen, iupac)
+            stage.records += 1
 
-        for i in gap_dict:
-            gaplen = gap_dict[i][1]-gap_dict[i][0]+1
-            print('{0}\t{1}\t{2:,}\t{3:,}\t{4:,}'.format(seqid, i, gap_dict[i][0], gap_dict[i][1], gaplen))
+        with PROFILE.stage("write") as stage:
+            for i in gap_dict:
+                gaplen = gap_dict[i][1]-gap_dict[i][0]+1
+                print('{0}\t{1}\t{2:,}\t{3:,}\t{4:,}'.format(seqid, i, gap_dict[i][0], gap_dict[i][1], gaplen))
+            stage.records += len(gap_dict)
 
 
 def add_help_args(parser):
 
     parser.add_argument('genome',
         help='Input genome file.')
+    parser.add_argument('-m', '--minlen', metavar='INT', type=int, default=1,
+        help='Minimum length of the reported gap, default=1.')
+    parser.add_argument('--iupac', action='store_true',
+        help='Treat IUPAC ambiguity bases (R,Y,K,M,S,W,B,D,H,V) as gaps.')
+    parser.add_argument('--bgzip', action='store_true',
+        help='Write the output in BGZF format.')
+    add_profile_args(parser)
 
     return parser
 
@@ -165,7 +132,10 @@ contact:  %s <%s>\
 
     args = add_help_args(parser).parse_args()
 
-    stat_genome_gap(args.genome)
+    with bgzip_output(args.bgzip):
+        start_profile(args, [args.genome])
+        stat_genome_gap(args.genome, args.minlen, args.iupac)
+        finish_profile()
 
 
 if __name__ == "__main__":